@@ -1,3 +1,11 @@
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from itertools import groupby
+from operator import itemgetter
+
+_NO_RIDS = ()  # shared result for a missing key or column, so a miss allocates nothing
+
+
 class Index:
     """
     A data structure holding indices for various columns of a table. Key column should be indexed by default,
@@ -8,7 +16,8 @@ class Index:
     def __init__(self, table):
         self.table = table
         self.indices = [None] * table.num_columns  # One index for each table. All are empty initially.
-        # An index looks like {value: {rid1, rid2, ...}}
+        # An index looks like {value: array('q', [rid1, rid2, ...])}, each bucket sorted by rid
+        self.sorted_values = [None] * table.num_columns  # per index, its distinct values in ascending order
         self.create_index(table.key)  # Key column should be indexed by default
 
     def create_index(self, column_number):
@@ -17,14 +26,14 @@ class Index:
         """
         if self.indices[column_number] is not None:
             return  # index already exists for this column
-        idx = {}  # {value: {rid1, rid2, ...}}
+        idx = {}  # {value: array('q', [rid1, rid2, ...])}
+        # populate the index if there are existing records: pull the whole column out in one pass,
+        # sort the (value, rid) pairs once, then cut each run of equal values into a bucket
+        rids, values = self.table.get_column_array(column_number)
+        for value, pairs in groupby(sorted(zip(values, rids)), key=itemgetter(0)):
+            idx[value] = array('q', map(itemgetter(1), pairs))
         self.indices[column_number] = idx  # add index to indices list
-        # populate the index if there are existing records
-        for rid, (pages, offset) in self.table.page_directory.items():
-            value = pages[column_number].read(offset)  # read the value from the page
-            if value not in idx:
-                idx[value] = set()  # if the value isn't in the index yet, create a new set
-            idx[value].add(rid)  # add the rid to the set for this value
+        self.sorted_values[column_number] = list(idx)  # values came out of the sort in order
 
     def drop_index(self, column_number):
         """
@@ -33,27 +42,34 @@ class Index:
         if column_number == self.table.key:
             return  # cannot drop index on key column
         self.indices[column_number] = None  # reset the index to None
+        self.sorted_values[column_number] = None
 
     def locate(self, column, value):
         """
         returns the location of all records with the given value on column "column"
+        The result is the index's own bucket, so callers must not modify it
         """
         idx = self.indices[column]
         if idx is None:
-            return set()  # if we haven't created an index for this column, return empty set
-        return idx.get(value, set())  # return the set of RIDs for this value, or empty set if value not found
+            return _NO_RIDS  # if we haven't created an index for this column, return no RIDs
+        return idx.get(value, _NO_RIDS)  # return the RIDs for this value, or none if value not found
 
     def locate_range(self, begin, end, column):
         """
         Returns the RIDs of all records with values in column "column" between "begin" and "end" (inclusive)
         """
         idx = self.indices[column]
-        result = set()
+        result = array('q')
         if idx is None:
             return result  # we haven't created an index for this column
-        for value, rids in idx.items():
-            if begin <= value <= end:
-                result.update(rids)  # add all RIDs for this value to the result set
+        # binary search the sorted values for the [begin, end] slice instead of testing every value
+        values = self.sorted_values[column]
+        if not values or end < values[0] or begin > values[-1]:
+            return result  # the range misses the index's min/max entirely
+        lo = bisect_left(values, begin)
+        hi = bisect_right(values, end, lo)
+        for value in values[lo:hi]:
+            result.extend(idx[value])  # buckets of distinct values never share a RID, so just concatenate
         return result
 
     def insert(self, column, value, rid):
@@ -64,9 +80,12 @@ class Index:
         idx = self.indices[column]
         if idx is None:
             return  # index does not exist for this column
-        if value not in idx:
-            idx[value] = set()
-        idx[value].add(rid)
+        rids = idx.get(value)
+        if rids is None:
+            idx[value] = array('q', (rid,))
+            insort(self.sorted_values[column], value)  # keep the values sorted for locate_range
+        else:
+            insort(rids, rid)
 
     def delete(self, column, value, rid):
         """
@@ -77,14 +96,21 @@ class Index:
         if idx is None:
             return  # index does not exist for this column
         if value in idx:
-            idx[value].discard(rid)
-            if not idx[value]:  # if the set is now empty, remove the entry from the index
+            rids = idx[value]
+            i = bisect_left(rids, rid)  # buckets are sorted, so find the rid by binary search
+            if i < len(rids) and rids[i] == rid:
+                del rids[i]
+            if not rids:  # if the bucket is now empty, remove the entry from the index
                 del idx[value]
+                values = self.sorted_values[column]
+                del values[bisect_left(values, value)]
 
     def update(self, column, old_value, new_value, rid):
         """
         Updates a record's value in the index for the specified column.
         Should be called whenever a record is updated in the table.
         """
+        if old_value == new_value:
+            return  # the rid already sits under this value
         self.delete(column, old_value, rid)
         self.insert(column, new_value, rid)
@@ -1,4 +1,5 @@
 from lstore.index import Index
+from array import array
 from lstore.page import Page
 from time import time
 
@@ -217,6 +218,36 @@ class Table:
         
         return record_data
     
+    def get_column_array(self, column):
+        """
+        Read the latest value of one user column for every live base record, page by page
+        Returns two parallel arrays: (rids, values)
+        """
+        rids = array('q')
+        values = array('Q')  # Page.read decodes values as unsigned
+        col_index = 4 + column
+        for page_range in self.page_ranges:
+            base_pages = page_range.base_pages
+            for page_index, rid_page in enumerate(base_pages[RID_COLUMN]):
+                size = rid_page.num_records * 8
+                # view each page's bytes as 64-bit ints instead of decoding slot by slot
+                rid_slots = memoryview(rid_page.data)[:size].cast('Q')
+                indirection_slots = memoryview(base_pages[INDIRECTION_COLUMN][page_index].data)[:size].cast('Q')
+                value_slots = memoryview(base_pages[col_index][page_index].data)[:size].cast('Q')
+                for slot, rid in enumerate(rid_slots):
+                    if rid == self.DELETED_RID:
+                        continue
+                    tail_rid = indirection_slots[slot]
+                    if tail_rid == 0:
+                        value = value_slots[slot]
+                    else:
+                        # tail records hold every column, so the newest one has the latest value
+                        tail_pages, tail_offset = self.page_directory[tail_rid]
+                        value = tail_pages[col_index][tail_offset // 512].read(tail_offset % 512)
+                    rids.append(rid)
+                    values.append(value)
+        return rids, values
+
     def get_latest_version(self, rid):
         """
         Get the latest version of a record by following the indirection chain
@@ -8,7 +8,7 @@ class TransactionWorker:
     # Creates a transaction worker object.
     """
     def __init__(self, transactions = None):
-        self.stats = []
+        self.stats = bytearray()  # one byte per transaction: 1 committed, 0 aborted
         # avoid shared list across instances
         self.transactions = list(transactions) if transactions else []
         self.result = 0
@@ -41,13 +41,14 @@ class TransactionWorker:
 
 
     def __run(self):
+        stats_append = self.stats.append  # bound once, not looked up per transaction
         for transaction in self.transactions:
             try:
                 ok = transaction.run()
             # each transaction returns True if committed or False if aborted
             except Exception:
                 ok = False
-            self.stats.append(ok)
+            stats_append(1 if ok else 0)
         # stores the number of transactions that committed
-        self.result = sum(1 for ok in self.stats if ok)
+        self.result = self.stats.count(1)
 
@@ -1,22 +1,5 @@
 from lstore.config import INDIRECTION_COLUMN
-
-
-class IndexNode:
-    """
-    A node in a doubly linked list used by the index. Holds a value, a set of RIDs for that
-    value, and pointers to the next and previous nodes in sorted order.
-    """
-    def __init__(self, value):
-        self.value = value
-        self.rids = set()
-        self.next = None
-        self.prev = None
-
-    def __str__(self):
-        return f"IndexNode(value={self.value}, rids={self.rids})"
-
-    def __repr__(self):
-        return self.__str__()
+from sortedcontainers import SortedList
 
 
 class Index:
@@ -29,7 +12,8 @@ class Index:
     def __init__(self, table, create_index):
         self.table = table
         self.indices = [None] * table.num_columns  # One index for each table. All are empty initially.
-        # Each column has an index structure: tuple(idx_map: dict, head: IndexNode, tail: indexNode) or None if no index
+        # Each column has an index structure: tuple(idx_map: dict value -> set of rids, sorted_keys: SortedList)
+        # or None if no index. Keys are kept in the SortedList's contiguous arrays instead of linked nodes.
         if create_index:
             self.create_index(table.key)  # Key column should be indexed by default
 
@@ -43,11 +27,9 @@ class Index:
             return
 
         idx_map = {}
-        head = None
-        tail = None
         # First, collect all tail RIDs by scanning base records' indirection columns
         tail_rids = set()
-        for rid, (pages, offset) in self.table.page_directory.items():
+        for rid, (range_idx, is_tail, offset) in self.table.page_directory.items():
             record = self.table.read_record(rid)
             if record is None:
                 continue  # skip deleted records
@@ -56,8 +38,7 @@ class Index:
             if indirection_rid != 0:  # if indirection is non-zero, it's a tail record
                 tail_rids.add(indirection_rid)
         # Collect all values and their RIDs from the table, skipping tail records
-        temp_idx_map = SortedDict()
-        for rid, (pages, offset) in self.table.page_directory.items():
+        for rid, (range_idx, is_tail, offset) in self.table.page_directory.items():
             if rid in tail_rids:
                 continue  # Skip tail records
             record = self.table.read_record(rid)
@@ -72,23 +53,8 @@ class Index:
                 idx_map[value] = set()
             idx_map[value].add(rid)
 
-        # Build doubly-linked list sorted by value
-        last_node = None
-        for key in temp_idx_map:
-            # Create new node and populate RIDs
-            node = IndexNode(key)
-            node.rids.update(idx_map[key])
-            idx_map[key] = node
-
-            if last_node is None:
-                head = node
-            else:
-                last_node.next = node
-                node.prev = last_node
-            last_node = node
-
-        tail = last_node
-        self.indices[column_number] = (idx_map, head, tail)
+        sorted_keys = SortedList(idx_map.keys())
+        self.indices[column_number] = (idx_map, sorted_keys)
 
     def drop_index(self, column_number):
         """
@@ -105,10 +71,10 @@ class Index:
         column_index = self.indices[column]
         # If index exists, use it
         if column_index is not None:
-            idx_map, head, tail = column_index
-            node = idx_map.get(value)
-            if node:
-                return node.rids
+            idx_map, sorted_keys = column_index
+            rids = idx_map.get(value)
+            if rids:
+                return rids
             return set()
 
         # scan page_directory if no index
@@ -143,14 +109,10 @@ class Index:
                     result.add(rid)
             return result
 
-        idx_map, head, tail = column_index
-        cur_node = head
-        # TODO: optimize by binary search
-        while cur_node and cur_node.value < begin:
-            cur_node = cur_node.next
-        while cur_node and cur_node.value <= end:
-            result.update(cur_node.rids)
-            cur_node = cur_node.next
+        idx_map, sorted_keys = column_index
+        # Binary search both ends of the range, then step through the keys in between
+        for key in sorted_keys.irange(begin, end):
+            result.update(idx_map[key])
         return result
 
     def insert(self, column, value, rid):
@@ -161,38 +123,14 @@ class Index:
         column_index = self.indices[column]
         if column_index is None:
             return  # index does not exist for this column
-        idx_map, head, tail = column_index
-        if value in idx_map:  # Value already exists in index
-            node = idx_map[value]
-            node.rids.add(rid)
+        idx_map, sorted_keys = column_index
+        rids = idx_map.get(value)
+        if rids is not None:  # Value already exists in index
+            rids.add(rid)
             return
         # New value needs to be inserted
-        node = IndexNode(value)
-        node.rids.add(rid)
-        idx_map[value] = node
-        # Insert into LL in sorted order
-        if head is None:  # empty list
-            head = tail = node
-        elif value < head.value:  # insert at head
-            node.next = head
-            head.prev = node
-            head = node
-        elif value > tail.value:  # insert at tail
-            tail.next = node
-            node.prev = tail
-            tail = node
-        else:  # insert in middle
-            # TODO: optimize by binary search
-            cur_node = head
-            while cur_node.value < value:
-                cur_node = cur_node.next
-            # Insert before cur_node
-            prev_node = cur_node.prev
-            prev_node.next = node
-            node.prev = prev_node
-            node.next = cur_node
-            cur_node.prev = node
-        self.indices[column] = (idx_map, head, tail)  # update index
+        idx_map[value] = {rid}
+        sorted_keys.add(value)
 
     def delete(self, column, value, rid):
         """
@@ -202,27 +140,21 @@ class Index:
         column_index = self.indices[column]
         if column_index is None:
             return  # index does not exist for this column
-        idx_map, head, tail = column_index
-        node_to_update = idx_map.get(value)
-        if not node_to_update:
+        idx_map, sorted_keys = column_index
+        rids = idx_map.get(value)
+        if not rids:
             return  # value not found in index
-        node_to_update.rids.discard(rid)
-        if not node_to_update.rids:  # If node is not empty, remove it
-            if node_to_update.prev:  # unlink from list
-                node_to_update.prev.next = node_to_update.next
-            else:  # it was the head
-                head = node_to_update.next
-            if node_to_update.next:
-                node_to_update.next.prev = node_to_update.prev
-            else:  # it was the tail
-                tail = node_to_update.prev
+        rids.discard(rid)
+        if not rids:  # drop the key once no record holds it
             del idx_map[value]  # remove from map
-            self.indices[column] = (idx_map, head, tail)  # update index
+            sorted_keys.remove(value)
 
     def update(self, column, old_value, new_value, rid):
         """
         Updates a record's value in the index for the specified column.
         Should be called whenever a record is updated in the table.
         """
+        if old_value == new_value:
+            return  # the rid already sits under this value
         self.delete(column, old_value, rid)
         self.insert(column, new_value, rid)
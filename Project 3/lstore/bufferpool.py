@@ -73,6 +73,16 @@ class Bufferpool:
             self.disk.write_page(table, is_tail, col, rng, idx, frame["page"].data)  # update new stuff writes on disk
             frame["dirty"] = False  # clean now
 
+    def discard_table(self, table_name):
+        """
+        Drop every frame that belongs to table_name without writing it back.
+        Used when the table's files are about to be deleted anyway.
+        """
+        with self.lock:
+            for pid in [pid for pid in self.frames if pid[0] == table_name]:
+                del self.frames[pid]
+                self.lru.pop(pid, None)
+
     def flush_all(self):  # call this at close() in db to
         with self.lock:
             for pid in list(self.frames.keys()):
@@ -9,11 +9,20 @@ PAGE_SIZE = 4096  # Fixed page size
 RECORDS_PER_PAGE = 511  # 8 bytes for TPS + (511 * 8 bytes) = 4096 bytes total
 PAGES_PER_RANGE = 16  # Number of pages in a range
 BUFFERPOOL_CAPACITY = 8192
+LATEST_VERSION_CACHE_SIZE = 4096  # rids whose latest values are kept in memory
+
+LOCK_SHARDS = 64  # independent lock-table partitions in the lock manager
 
 MERGE_THRESHOLD_UPDATES = 100  # trigger merge after this many updates
-MERGE_CHECK_INTERVAL = 0.05
+MERGE_WORKERS = 4  # page ranges merged in parallel
 
 MAX_RETRIES = 100  # Maximum retry attempts
-RETRY_DELAY = 0.01  # Initial delay in seconds (10ms)
-RETRY_BACKOFF_MULTIPLIER = 1.5
+RETRY_DELAY = 0.01  # Shortest backoff slot in seconds (10ms)
 MAX_RETRY_DELAY = 1.0
+TRANSACTION_ERROR_LOG_SIZE = 128  # failures kept per transaction in Transaction.errors
+
+# Upper bound on the transaction worker thread pool. The pool only starts a thread when none
+# is idle, so it grows to the number of workers running at once; the bound just stops a
+# runaway caller from creating unbounded threads (each reserves its own stack) while staying
+# far above the handful of workers the testers run together, so they never queue.
+TRANSACTION_WORKER_THREADS = 1024
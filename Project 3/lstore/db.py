@@ -1,9 +1,10 @@
-from lstore.table import Table, PageRange
+from lstore.table import Table
 from lstore.transaction import Transaction
 from lstore.index import Index
 from lstore.disk import DiskManager
 from lstore.bufferpool import Bufferpool
-from lstore.config import BUFFERPOOL_CAPACITY, RECORDS_PER_PAGE
+from lstore.page import RunLengthPage
+from lstore.config import BUFFERPOOL_CAPACITY, RECORDS_PER_PAGE, SCHEMA_ENCODING_COLUMN
 from lstore.lock_manager import LockManager
 import os
 import shutil
@@ -115,21 +116,7 @@ class Database:
             old_table.stop_merge_thread()
             del self.tables[name]
 
-            # Clear its on-disk directory so old pages don't linger
-            if self.disk_manager is not None:
-                table_dir = self.disk_manager.table_dir(name)
-                if os.path.exists(table_dir):
-                    import shutil
-                    shutil.rmtree(table_dir, ignore_errors=True)
-
-            # ALSO clear any bufferpool frames that belong to this table
-            if self.bufferpool is not None:
-                for pid in list(self.bufferpool.frames.keys()):
-                    # pid is (table_name, is_tail, col, rng, idx)
-                    if pid[0] == name:
-                        del self.bufferpool.frames[pid]
-                        if pid in self.bufferpool.lru:
-                            del self.bufferpool.lru[pid]
+            self._discard_table_storage(name)
 
         # Initialize bufferpool if open() wasn't called
         if self.bufferpool is None:
@@ -155,6 +142,21 @@ class Database:
         # Stop merge thread before dropping table
         table.stop_merge_thread()
         del self.tables[name]
+        self._discard_table_storage(name)
+
+    def _discard_table_storage(self, name):
+        """
+        Forget a table's pages: bufferpool frames are dropped without being
+        flushed (their files are going away) and the table directory is
+        removed with a single rmtree.
+        """
+        if self.bufferpool is not None:
+            self.bufferpool.discard_table(name)
+
+        if self.disk_manager is not None:
+            table_dir = self.disk_manager.table_dir(name)
+            if os.path.exists(table_dir):
+                shutil.rmtree(table_dir, ignore_errors=True)
 
     def get_table(self, name):
         """
@@ -188,6 +190,7 @@ class Database:
                     "num_tail_records": pr.num_tail_records,
                     "num_base_pages_per_col": pr.num_base_pages_per_col,
                     "num_tail_pages_per_col": pr.num_tail_pages_per_col,
+                    "schema_runs": [runs.to_meta() for runs in pr.schema_runs],
                 }
             )
 
@@ -199,11 +202,12 @@ class Database:
         if table.current_tail_page_range is not None:
             current_tail_range_idx = table.current_tail_page_range.range_idx
 
-        # Save which columns have indexes
-        indexed_columns = []
-        for col_num in range(table.num_columns):
-            if table.index.indices[col_num] is not None:
-                indexed_columns.append(col_num)
+        # Save which columns have indexes, and the indexes themselves so open() can skip rebuilding them
+        indexed_columns = list(table.index.indexed_columns)
+        for col_num in indexed_columns:
+            self.disk_manager.write_index(
+                table.name, col_num, table.index.epoch, table.index.dump_index(col_num)
+            )
 
         metadata = {
             "num_columns": table.num_columns,
@@ -215,6 +219,7 @@ class Database:
             "current_tail_range_idx": current_tail_range_idx,
             "updates_since_merge": table.updates_since_merge,
             "indexed_columns": indexed_columns,
+            "index_epoch": table.index.epoch,
         }
 
         self.disk_manager.write_meta(table.name, metadata)
@@ -238,20 +243,22 @@ class Database:
         table.updates_since_merge = metadata.get("updates_since_merge", 0)
 
         # rebuild page ranges
-        for range_idx, pr_info in enumerate(metadata["page_ranges"]):
-            # NOTE: new PageRange constructor: (table, range_idx)
-            pr = PageRange(table, range_idx)
+        for pr_info in metadata["page_ranges"]:
+            pr = table.add_page_range()
             pr.num_base_records = pr_info["num_base_records"]
             pr.num_tail_records = pr_info["num_tail_records"]
             pr.num_base_pages_per_col = pr_info["num_base_pages_per_col"]
             pr.num_tail_pages_per_col = pr_info["num_tail_pages_per_col"]
-
-            table.page_ranges.append(pr)
+            saved_schema_runs = pr_info.get("schema_runs")
+            if saved_schema_runs is not None:
+                pr.schema_runs = [RunLengthPage(*runs) for runs in saved_schema_runs]
 
             # reconstruct Page.num_records for base pages
             for col_idx, num_pages in enumerate(pr.num_base_pages_per_col):
+                if col_idx == SCHEMA_ENCODING_COLUMN and saved_schema_runs is not None:
+                    continue  # restored from schema_runs above, its base pages were never written
                 for page_idx in range(num_pages):
-                    pid = (table_name, False, col_idx, range_idx, page_idx)
+                    pid = pr._page_id(False, col_idx, page_idx)
                     page = self.bufferpool.fix_page(pid, mode="r")
 
                     records_before = page_idx * RECORDS_PER_PAGE
@@ -263,12 +270,18 @@ class Database:
                     else:
                         page.num_records = 0
 
+                    # older metadata kept the schema encoding in base pages
+                    if col_idx == SCHEMA_ENCODING_COLUMN and saved_schema_runs is None:
+                        runs = pr._schema_page(page_idx)
+                        for slot in range(page.num_records):
+                            runs.write(page.read(slot))
+
                     self.bufferpool.unfix_page(pid)
 
             # reconstruct Page.num_records for tail pages
             for col_idx, num_pages in enumerate(pr.num_tail_pages_per_col):
                 for page_idx in range(num_pages):
-                    pid = (table_name, True, col_idx, range_idx, page_idx)
+                    pid = pr._page_id(True, col_idx, page_idx)
                     page = self.bufferpool.fix_page(pid, mode="r")
 
                     records_before = page_idx * RECORDS_PER_PAGE
@@ -315,14 +328,18 @@ class Database:
             else:
                 table.current_tail_page_range = table.page_ranges[-1]
 
-        # rebuild indexes (primary key + any others that were saved)
-        table.index = Index(table, create_index=True)  # This creates the primary key index
-        
-        # Restore indexes on other columns that were saved
+        # restore indexes (primary key + any others that were saved). A saved index is
+        # only trusted if it was written in the same close() as this metadata.
+        table.index = Index(table, create_index=False)
+        index_epoch = metadata.get("index_epoch")
         indexed_columns = metadata.get("indexed_columns", [])
-        for col_num in indexed_columns:
-            if col_num != key_idx:  # Primary key is already indexed
+        for col_num in [key_idx] + [col for col in indexed_columns if col != key_idx]:
+            saved = self.disk_manager.read_index(table_name, col_num)
+            if saved is not None and index_epoch is not None and saved["epoch"] == index_epoch:
+                table.index.load_index(col_num, saved["entries"])
+            else:
                 table.index.create_index(col_num)
+        table.index.epoch = index_epoch or 0
         
         table.lock_manager = self.lock_manager
         self.tables[table_name] = table
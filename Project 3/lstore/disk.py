@@ -58,3 +58,18 @@ class DiskManager:
             return None
         with open(path, "r") as f:
             return json.load(f)
+
+    def index_path(self, table_name, col):
+        return os.path.join(self.table_dir(table_name), f"index_{col}.json")  # file that holds a saved column index
+
+    def write_index(self, table_name, col, epoch, entries):
+        os.makedirs(self.table_dir(table_name), exist_ok=True)
+        with open(self.index_path(table_name, col), "w") as f:
+            json.dump({"epoch": epoch, "entries": entries}, f)  # entries: [[value, [rids]], ...] in key order
+
+    def read_index(self, table_name, col):
+        path = self.index_path(table_name, col)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
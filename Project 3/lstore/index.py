@@ -1,19 +1,6 @@
-class IndexNode:
-    """
-    A node in a doubly linked list used by the index. Holds a value, a set of RIDs for that
-    value, and pointers to the next and previous nodes in sorted order.
-    """
-    def __init__(self, value):
-        self.value = value
-        self.rids = set()
-        self.next = None
-        self.prev = None
-
-    def __str__(self):
-        return f"IndexNode(value={self.value}, rids={self.rids})"
+from sortedcontainers import SortedDict
 
-    def __repr__(self):
-        return self.__str__()
+_NO_RIDS = frozenset()  # shared result for a missing key, so a miss allocates nothing
 
 
 class Index:
@@ -26,26 +13,13 @@ class Index:
     def __init__(self, table, create_index):
         self.table = table
         self.indices = [None] * table.num_columns  # One index for each table. All are empty initially.
-        # Each column has an index structure: tuple(idx_map: dict, head: IndexNode, tail: indexNode) or None if no index
+        self.indexed_columns = []  # column numbers that currently have an index, in ascending order
+        self.indexed_mask = 0  # same set as a bitmask in schema-encoding order (bit i = column i)
+        self.epoch = 0  # bumped on every index change; tells a saved index apart from a stale one
+        # Each column has an index structure: SortedDict(value -> set of RIDs) or None if no index
         if create_index:
             self.create_index(table.key)  # Key column should be indexed by default
 
-    def _binary_search(self, sorted_keys, value, dead_keys):
-        left = 0
-        right = len(sorted_keys)
-
-        while left < right:
-            mid = (left + right) // 2
-            mid_val = sorted_keys[mid]
-            if mid_val in dead_keys:
-                right = mid
-                continue
-            if mid_val < value:
-                left = mid + 1
-            else:
-                right = mid
-        return left
-
     def create_index(self, column_number):
         """
         Create index on specific column.
@@ -55,47 +29,29 @@ class Index:
         if self.indices[column_number] is not None:
             return
 
-        idx_map = {}
-        head = None
-        tail = None
-        dead_keys = set()
-        sorted_keys = []
+        # Column-wise scan of the latest values of live base records
+        rids, values = self.table.scan_column(column_number)
 
-        # Scan page_directory: rid -> (range_idx, is_tail, offset)
-        for rid, (range_idx, is_tail, offset) in self.table.page_directory.items():
-            if is_tail:  # skip tail records
-                continue
+        self.indices[column_number] = SortedDict()
+        self.indexed_columns = sorted(self.indexed_columns + [column_number])
+        self.indexed_mask |= 1 << column_number
+        self.bulk_insert(column_number, values, rids)
 
-            latest_values, _ = self.table.get_latest_version(rid)
-            if latest_values is None:
-                continue  # deleted or inaccessible
-
-            value = latest_values[column_number]
-            if value not in idx_map:
-                idx_map[value] = set()
-            idx_map[value].add(rid)
-
-        # Build sorted keys array from actual keys
-        alive_keys = sorted(idx_map.keys())
-        sorted_keys.extend(alive_keys)
-
-        # Build doubly-linked list sorted by value
-        last_node = None
-        for key in alive_keys:
-            node = IndexNode(key)
-            node.rids = idx_map[key]
-            idx_map[key] = node
-
-            if last_node is None:
-                head = node
-            else:
-                last_node.next = node
-                node.prev = last_node
-            last_node = node
-
-        tail = last_node
+    def load_index(self, column_number, entries):
+        """
+        Install an index on a column from saved [value, [rids]] entries (in key order)
+        instead of scanning the table.
+        """
+        self.indices[column_number] = SortedDict((value, set(rids)) for value, rids in entries)
+        if column_number not in self.indexed_columns:
+            self.indexed_columns = sorted(self.indexed_columns + [column_number])
+        self.indexed_mask |= 1 << column_number
 
-        self.indices[column_number] = (idx_map, head, tail, sorted_keys, dead_keys)
+    def dump_index(self, column_number):
+        """
+        Return a column's index as [value, [rids]] entries in key order, for saving.
+        """
+        return [[value, sorted(rids)] for value, rids in self.indices[column_number].items()]
 
     def drop_index(self, column_number):
         """
@@ -104,76 +60,50 @@ class Index:
         if column_number == self.table.key:
             return  # cannot drop index on key column
         self.indices[column_number] = None  # reset the index to None
+        if column_number in self.indexed_columns:
+            self.indexed_columns = [col for col in self.indexed_columns if col != column_number]
+        self.indexed_mask &= ~(1 << column_number)
 
     def locate(self, column, value):
         """
         returns the location of all records with the given value on column "column"
+        The result is a snapshot: callers iterate it while other threads keep changing the index.
         """
         column_index = self.indices[column]
         # If index exists, use it
         if column_index is not None:
-            idx_map, head, tail, sorted_keys, dead_keys = column_index
-            if value in dead_keys:
-                return set()
-            node = idx_map.get(value)
-            if node:
-                return node.rids.copy()
-            return set()
+            rids = column_index.get(value)
+            if rids:
+                return set(rids)
+            return _NO_RIDS
 
-        # scan page_directory if no index
-        result = set()
-        for rid, (range_idx, is_tail, offset) in self.table.page_directory.items():
-            # only consider base logical records
-            if is_tail:
-                continue
-            latest_values, _ = self.table.get_latest_version(rid)
-            if latest_values and latest_values[column] == value:
-                result.add(rid)
-        return result
+        # scan the column if no index
+        rids, values = self.table.scan_column(column)
+        return {rid for rid, column_value in zip(rids, values) if column_value == value}
+
+    def contains(self, column, value):
+        """
+        Returns True if some record has the given value on column "column", without copying its RIDs.
+        """
+        column_index = self.indices[column]
+        if column_index is not None:
+            return bool(column_index.get(value))
+        return bool(self.locate(column, value))
 
     def locate_range(self, begin, end, column):
         """
         Returns the RIDs of all records with values in column "column" between "begin" and "end" (inclusive)
         """
         column_index = self.indices[column]
-        result = set()
-        # If no index, fall back to scanning page_directory
+        # If no index, fall back to scanning the column
         if column_index is None:
-            for rid, (range_idx, is_tail, offset) in self.table.page_directory.items():
-                if is_tail:
-                    continue
-                latest_values, _ = self.table.get_latest_version(rid)
-                if latest_values and begin <= latest_values[column] <= end:
-                    result.add(rid)
-            return result
+            rids, values = self.table.scan_column(column)
+            return {rid for rid, value in zip(rids, values) if begin <= value <= end}
 
-        idx_map, head, tail, sorted_keys, dead_keys = column_index
-        # binary search to find starting index
-        low = 0
-        sorted_keys_size = len(sorted_keys)
-        high = sorted_keys_size - 1
-        while low < high:
-            mid = (low + high) // 2
-            if sorted_keys[mid] < begin:
-                low = mid + 1
-            else:
-                high = mid
-        # find first alive node starting from low
-        start_node = None
-        for i in range(low, sorted_keys_size):
-            key = sorted_keys[i]
-            if key > end:
-                break
-            if key not in dead_keys:
-                start_node = idx_map[key]
-                if start_node:
-                    break
-        # traverse from start_node
-        cur_node = start_node
-        while cur_node and cur_node.value <= end:
-            result.update(cur_node.rids.copy())
-            cur_node = cur_node.next
-        return result
+        # union every bucket in the range with one C-level call, under the table's index lock
+        # so a writer cannot drop a key or resize a bucket while irange walks them
+        with self.table.index_lock:
+            return set().union(*map(column_index.__getitem__, column_index.irange(begin, end)))
 
     def insert(self, column, value, rid):
         """
@@ -183,49 +113,12 @@ class Index:
         column_index = self.indices[column]
         if column_index is None:
             return  # index does not exist for this column
-        idx_map, head, tail, sorted_keys, dead_keys = column_index
-        if value in dead_keys:  # Revive dead key if exists
-            dead_keys.remove(value)
-        if value in idx_map:  # Value already exists in index
-            idx_map[value].rids.add(rid)
-            return
-        # New value needs to be inserted
-        node = IndexNode(value)
-        node.rids.add(rid)
-        idx_map[value] = node
-        # Quick insert at head or tail
-        if tail is None:
-            head = tail = node
-            sorted_keys.append(value)
-            self.indices[column] = (idx_map, head, tail, sorted_keys, dead_keys)
-            return
-        if value > tail.value:
-            tail.next = node
-            node.prev = tail
-            tail = node
-            sorted_keys.append(value)
-            self.indices[column] = (idx_map, head, tail, sorted_keys, dead_keys)
-            return
-        # Find position using binary search
-        pos = self._binary_search(sorted_keys, value, dead_keys)
-        sorted_keys.insert(pos, value)
-        # Insert into LL in sorted order
-        if pos == 0:  # insert at head
-            node.next = head
-            head.prev = node
-            head = node
-        elif pos == len(sorted_keys) - 1:  # insert at tail
-            tail.next = node
-            node.prev = tail
-            tail = node
-        else:  # insert in middle
-            prev_node = idx_map[sorted_keys[pos - 1]]
-            next_node = idx_map[sorted_keys[pos + 1]]
-            node.prev = prev_node
-            node.next = next_node
-            prev_node.next = node
-            next_node.prev = node
-        self.indices[column] = (idx_map, head, tail, sorted_keys, dead_keys)  # update index
+        self.epoch += 1
+        rids = column_index.get(value)
+        if rids is None:
+            column_index[value] = {rid}
+        else:
+            rids.add(rid)
 
     def delete(self, column, value, rid):
         """
@@ -235,31 +128,72 @@ class Index:
         column_index = self.indices[column]
         if column_index is None:
             return  # index does not exist for this column
-        idx_map, head, tail, sorted_keys, dead_keys = column_index
-        node_to_update = idx_map.get(value)
-        if not node_to_update:
+        self.epoch += 1
+        rids = column_index.get(value)
+        if not rids:
             return  # value not found in index
-        node_to_update.rids.discard(rid)
-        if node_to_update.rids:
-            return  # If node is not empty, do nothing
-        dead_keys.add(value)  # mark key as dead
-        # Remove node completely
-        if node_to_update.prev:  # unlink from list
-            node_to_update.prev.next = node_to_update.next
-        else:  # it was the head
-            head = node_to_update.next
-        if node_to_update.next:
-            node_to_update.next.prev = node_to_update.prev
-        else:  # it was the tail
-            tail = node_to_update.prev
-        del idx_map[value]  # remove from map
+        rids.discard(rid)
+        if not rids:
+            del column_index[value]  # drop the key once no record holds it
 
-        self.indices[column] = (idx_map, head, tail, sorted_keys, dead_keys)  # update index
+    def bulk_insert(self, column, values, rids):
+        """
+        Inserts many (value, rid) pairs into the index for the specified column at once.
+        Pairs are grouped by value first, so each new key enters the SortedDict in one
+        sorted batch instead of one O(log n) insert per record.
+        """
+        column_index = self.indices[column]
+        if column_index is None:
+            return  # index does not exist for this column
+
+        rids_by_value = {}
+        for value, rid in zip(values, rids):
+            value_rids = rids_by_value.get(value)
+            if value_rids is None:
+                rids_by_value[value] = {rid}
+            else:
+                value_rids.add(rid)
+        self.epoch += 1
+
+        new_keys = {}
+        for value, value_rids in rids_by_value.items():
+            existing = column_index.get(value)
+            if existing is None:
+                new_keys[value] = value_rids
+            else:
+                existing.update(value_rids)
+        column_index.update(new_keys)
+
+    def insert_row(self, rid, values):
+        """
+        Inserts rid into every existing index, taking each column's value from values.
+        """
+        for column in self.indexed_columns:
+            self.insert(column, values[column], rid)
+
+    def delete_row(self, rid, values):
+        """
+        Removes rid from every existing index, using each column's value from values.
+        """
+        for column in self.indexed_columns:
+            self.delete(column, values[column], rid)
+
+    def update_row(self, rid, old_values, new_values):
+        """
+        Moves rid between keys in every existing index whose column is updated.
+        A None in new_values means that column is not changing.
+        """
+        for column in self.indexed_columns:
+            new_value = new_values[column]
+            if new_value is not None:
+                self.update(column, old_values[column], new_value, rid)
 
     def update(self, column, old_value, new_value, rid):
         """
         Updates a record's value in the index for the specified column.
         Should be called whenever a record is updated in the table.
         """
+        if old_value == new_value:
+            return  # the rid already sits under this value
         self.delete(column, old_value, rid)
         self.insert(column, new_value, rid)
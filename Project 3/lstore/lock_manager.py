@@ -1,6 +1,9 @@
 import threading
+from collections import defaultdict
 from enum import Enum
 
+from lstore.config import LOCK_SHARDS
+
 
 class LockType(Enum):
     SHARED = 1
@@ -8,27 +11,56 @@ class LockType(Enum):
 
 
 class LockManager:
-    def __init__(self):
-        self.locks = {} 
-        self.lock_table = {}  
-        self.lock = threading.RLock()
+    def __init__(self, num_shards=LOCK_SHARDS):
+        # Record locks are split across shards, each with its own table and mutex,
+        # so transactions touching unrelated records do not serialize on one lock
+        self.num_shards = num_shards
+        self.shard_tables = [{} for _ in range(num_shards)]
+        self.shard_locks = [threading.RLock() for _ in range(num_shards)]
+        self.held = defaultdict(set)  # transaction_id -> record_ids it holds locks on
+        self.held_lock = threading.Lock()
     
+    def _shard(self, record_id):
+        return hash(record_id) % self.num_shards
+
     def acquire_lock(self, transaction_id, record_id, lock_type):
         """
         Acquire lock for a transaction.
         Returns True if successful, False if would cause conflict (abort transaction)
         """
-        with self.lock:
-            if record_id not in self.lock_table:
-                self.lock_table[record_id] = Lock(record_id)
+        shard = self._shard(record_id)
+        with self.shard_locks[shard]:
+            lock_table = self.shard_tables[shard]
+            if record_id not in lock_table:
+                lock_table[record_id] = Lock(record_id)
             
-            lock = self.lock_table[record_id]
-            return lock.acquire(transaction_id, lock_type)
+            lock = lock_table[record_id]
+            if not lock.acquire(transaction_id, lock_type):
+                return False
+        with self.held_lock:
+            self.held[transaction_id].add(record_id)
+        return True
     
     def release_locks(self, transaction_id):
-        with self.lock:
-            for lock in self.lock_table.values():
-                lock.release(transaction_id)
+        """
+        Releases every lock held by the transaction, touching only the records it locked.
+        Locks left with no holders are dropped so the lock table does not grow without bound.
+        """
+        with self.held_lock:
+            record_ids = self.held.pop(transaction_id, ())
+        for record_id in record_ids:
+            self._release_record(transaction_id, record_id)
+
+    def _release_record(self, transaction_id, record_id):
+        shard = self._shard(record_id)
+        with self.shard_locks[shard]:
+            lock_table = self.shard_tables[shard]
+            lock = lock_table.get(record_id)
+            if lock is None:
+                return
+            lock.release(transaction_id)
+            if lock.is_free():
+                del lock_table[record_id]
 
 
 class Lock:
@@ -73,6 +105,10 @@ class Lock:
             
             return False
     
+    def is_free(self):
+        with self.lock:
+            return self.exclusive_holder is None and not self.lock_holders
+
     def release(self, transaction_id):
         with self.lock:
             if transaction_id in self.lock_holders:
@@ -1,4 +1,12 @@
 from lstore.config import RECORDS_PER_PAGE, PAGE_SIZE
+from array import array
+from bisect import bisect_right
+import struct
+
+# every slot (and the TPS header) is a little-endian signed 64-bit int
+_Q = struct.Struct('<q')
+_pack_q = _Q.pack_into
+_unpack_q = _Q.unpack_from
 
 
 class Page:
@@ -27,8 +35,7 @@ class Page:
         # print("writing value:", value)
         if self.has_capacity():
             # Records start at byte 8 (first 8 bytes reserved for TPS)
-            offset = 8 + (self.num_records * 8)
-            self.data[offset:offset+8] = value.to_bytes(8, byteorder='little')
+            _pack_q(self.data, 8 + (self.num_records * 8), value)
             self.num_records += 1
             self.set_dirty()
         else:
@@ -38,9 +45,7 @@ class Page:
     def read(self, slot_number):
         # print("reading slot number:", slot_number)
         # Records start at byte 8 (first 8 bytes reserved for TPS)
-        offset = 8 + (slot_number * 8)
-        value = int.from_bytes(self.data[offset:offset+8], byteorder='little')
-        return value
+        return _unpack_q(self.data, 8 + (slot_number * 8))[0]
     
     def set_dirty(self):
         """Set page as dirty/modified (meaning it needs to be written to disk)"""
@@ -69,20 +74,92 @@ class Page:
     
     def get_tps(self):
         """Get TPS Number for merge tracking - stored in first 8 bytes of data"""
-        return int.from_bytes(self.data[0:8], byteorder='little')
+        return _unpack_q(self.data, 0)[0]
     
     def set_tps(self, tps_value):
         """Update TPS after merge completion - stored in first 8 bytes of data"""
-        self.data[0:8] = tps_value.to_bytes(8, byteorder='little')
+        _pack_q(self.data, 0, tps_value)
         self.set_dirty()
     
     def update(self, slot_number, value):
         """Update existing record at slot_number"""
         if slot_number < self.num_records:
             # Records start at byte 8 (first 8 bytes reserved for TPS)
-            offset = 8 + (slot_number * 8)
-            self.data[offset:offset+8] = value.to_bytes(8, byteorder='little')
+            _pack_q(self.data, 8 + (slot_number * 8), value)
             self.set_dirty()
             return True
         return False
-    
\ No newline at end of file
+
+
+class RunLengthPage:
+    """
+    Run-length encoded stand-in for a base page of a sparse, repetitive column
+    (the schema encoding). Keeps parallel typed arrays of run ends (exclusive
+    slot bound) and the value shared by every slot of that run.
+    """
+
+    def __init__(self, run_ends=(), values=()):
+        self.run_ends = array('q', run_ends)
+        self.values = array('q', values)
+
+    @property
+    def num_records(self):
+        return self.run_ends[-1] if self.run_ends else 0
+
+    def write(self, value):
+        """Append a value at the next slot, extending the last run if it matches"""
+        if self.values and self.values[-1] == value:
+            self.run_ends[-1] += 1
+        else:
+            self.run_ends.append(self.num_records + 1)
+            self.values.append(value)
+
+    def read(self, slot_number):
+        """Binary search the run containing slot_number"""
+        run = bisect_right(self.run_ends, slot_number)
+        if run == len(self.run_ends):
+            return 0
+        return self.values[run]
+
+    def update(self, slot_number, value):
+        """Update existing record at slot_number, splitting its run if needed"""
+        run = bisect_right(self.run_ends, slot_number)
+        if run == len(self.run_ends):
+            return False
+        old_value = self.values[run]
+        if old_value == value:
+            return True
+
+        start = self.run_ends[run - 1] if run else 0
+        end = self.run_ends[run]
+        new_ends = array('q')
+        new_values = array('q')
+        if slot_number > start:
+            new_ends.append(slot_number)
+            new_values.append(old_value)
+        new_ends.append(slot_number + 1)
+        new_values.append(value)
+        if end > slot_number + 1:
+            new_ends.append(end)
+            new_values.append(old_value)
+
+        self.run_ends[run:run + 1] = new_ends
+        self.values[run:run + 1] = new_values
+        self._coalesce(run - 1, run + len(new_ends))
+        return True
+
+    def _coalesce(self, first, last):
+        """Merge adjacent runs holding the same value between runs first..last"""
+        run = max(first, 0)
+        last = min(last, len(self.values) - 1)
+        while run < last:
+            if self.values[run] == self.values[run + 1]:
+                del self.run_ends[run]
+                del self.values[run]
+                last -= 1
+            else:
+                run += 1
+
+    def to_meta(self):
+        """Serializable form stored alongside the table metadata"""
+        return [list(self.run_ends), list(self.values)]
@@ -9,7 +9,6 @@ class Query:
     """
     def __init__(self, table):
         self.table = table
-        self.transaction_id = None  # Set by transaction
 
     def delete(self, primary_key, transaction=None):
         """Delete records matching the primary_key"""
@@ -22,7 +21,7 @@ class Query:
 
             # EXECUTION PHASE: Perform operations
             for rid in rids:
-                deleted = self.table.delete_record(rid)
+                deleted = self.table.delete_record(rid, transaction=transaction)
                 if deleted is False:
                     return False
             
@@ -34,7 +33,7 @@ class Query:
     def insert(self, *columns, transaction=None):
         """Insert a record with specified columns"""
         try:
-            rid = self.table.insert(*columns)
+            rid = self.table.insert(*columns, transaction=transaction)
             return rid is not None
         except Exception as e:
             print(f"Insert error: {e}")
@@ -53,16 +52,12 @@ class Query:
                     rids = self.table.index.locate(search_key_index, search_key)
 
             # If no index or no results, do full scan
-            if not rids:
-                with self.table.page_directory_lock:
-                    for rid, (range_idx, is_tail, offset) in list(self.table.page_directory.items()):
-                        if is_tail:
-                            continue
-                        values, _schema = self.table.get_latest_version(rid)
-                        if values is None:
-                            continue
-                        if search_key_index < len(values) and values[search_key_index] == search_key:
-                            rids.add(rid)
+            if not rids and 0 <= search_key_index < self.table.num_columns:
+                rids = set()  # locate's empty result is a shared frozenset, so collect into a fresh set
+                # Column-wise scan of the search column instead of materializing the page directory
+                for rid, value in zip(*self.table.scan_column(search_key_index)):
+                    if value == search_key:
+                        rids.add(rid)
 
             # EXECUTION PHASE: Retrieve records
             for rid in rids:
@@ -92,7 +87,7 @@ class Query:
 
             # cannot update primary key via update
             if columns[self.table.key] is not None and columns[self.table.key] != primary_key:
-                if self.table.index.locate(self.table.key, columns[self.table.key]):
+                if self.table.index.contains(self.table.key, columns[self.table.key]):
                     return False
 
             # locate RIDs for a given primary key via its index
@@ -102,7 +97,7 @@ class Query:
             
             # EXECUTION PHASE: Perform updates
             for rid in rids:
-                ok = self.table.update_record(rid, *columns)
+                ok = self.table.update_record(rid, *columns, transaction=transaction)
                 if ok is False:
                     return False
 
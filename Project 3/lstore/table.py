@@ -1,7 +1,10 @@
 from lstore.index import Index
-from lstore.page import Page
+from lstore.page import Page, RunLengthPage
 from lstore.config import *
 from time import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from array import array
 import threading
 
 
@@ -42,6 +45,15 @@ class PageRange:
 
         self.lock = threading.RLock()  # per page lock
 
+        # page_id tuples cached per [col][page] so the bufferpool hot path
+        # does not build a fresh tuple on every fix/unfix
+        self._base_pids = [self._build_page_ids(False, col) for col in range(self.num_columns)]
+        self._tail_pids = [self._build_page_ids(True, col) for col in range(self.num_columns)]
+
+        # schema encoding of base records is run-length encoded in memory
+        # (one RunLengthPage per base page) instead of living in bufferpool pages
+        self.schema_runs = []
+
     def has_capacity(self):
         """
         Just checking if there is space
@@ -49,10 +61,22 @@ class PageRange:
         with self.lock:
             return self.num_base_records < self.max_records
     
+    def _build_page_ids(self, is_tail, col_index):
+        """
+        Build the page_id tuples for every page a column can hold in this range.
+        """
+        return [
+            (self.table.name, is_tail, col_index, self.range_idx, page_index)
+            for page_index in range(PAGES_PER_RANGE)
+        ]
+
     def _page_id(self, is_tail, col_index, page_index):
         """
-        Build the page_id tuple used by the bufferpool.
+        Return the (cached) page_id tuple used by the bufferpool.
         """
+        col_pids = (self._tail_pids if is_tail else self._base_pids)[col_index]
+        if page_index < len(col_pids):
+            return col_pids[page_index]
         return (self.table.name, is_tail, col_index, self.range_idx, page_index)
 
     def write_base_record(self, record_data):
@@ -65,7 +89,12 @@ class PageRange:
 
             for col_index, value in enumerate(record_data):
                 page_index = offset // RECORDS_PER_PAGE
-                
+
+                # the schema encoding lives only in schema_runs, it has no base pages to count
+                if col_index == SCHEMA_ENCODING_COLUMN:
+                    self._schema_page(page_index).write(value)
+                    continue
+
                 # ensure we have enough pages for this column
                 if page_index >= self.num_base_pages_per_col[col_index]:
                     self.num_base_pages_per_col[col_index] += 1
@@ -91,6 +120,9 @@ class PageRange:
             slot_in_page = offset % RECORDS_PER_PAGE
 
             for col_index in range(self.num_columns):
+                if col_index == SCHEMA_ENCODING_COLUMN:
+                    record_data.append(self._schema_page(page_index).read(slot_in_page))
+                    continue
                 pid = self._page_id(False, col_index, page_index)
                 page = self.table.bufferpool.fix_page(pid, mode="r")
                 value = page.read(slot_in_page)
@@ -99,6 +131,56 @@ class PageRange:
 
             return record_data
 
+    def read_base_column_page(self, col_index, page_index):
+        """
+        Read every record's value of one physical column on one base page.
+        Returns a list indexed by slot.
+        """
+        with self.lock:
+            return self._read_base_column_page(col_index, page_index)
+
+    def _read_base_column_page(self, col_index, page_index):
+        """
+        read_base_column_page without taking the range lock. The page is pinned and copied
+        in one C-level call, so each slot is whole, but a concurrent writer's latest change
+        may be missed: only for readers that tolerate a slightly stale page.
+        """
+        count = min(RECORDS_PER_PAGE, self.num_base_records - page_index * RECORDS_PER_PAGE)
+        if count <= 0:
+            return []
+
+        pid = self._page_id(False, col_index, page_index)
+        page = self.table.bufferpool.fix_page(pid, mode="r")
+        with memoryview(page.data)[8:8 + count * 8] as raw:
+            with raw.cast('q') as slots:
+                values = slots.tolist()
+        self.table.bufferpool.unfix_page(pid)
+        return values
+
+    def _schema_page(self, page_index):
+        """
+        Return the run-length encoded schema encoding page for a base page index.
+        """
+        while page_index >= len(self.schema_runs):
+            self.schema_runs.append(RunLengthPage())
+        return self.schema_runs[page_index]
+
+    def _fix_base_page_for_update(self, col_index, page_index):
+        """
+        Fix a base page in write mode, restoring its record count if the page
+        was just loaded from disk. Returns (pid, page); caller must unfix.
+        """
+        pid = self._page_id(False, col_index, page_index)
+        page = self.table.bufferpool.fix_page(pid, mode="w")
+        if page.num_records == 0:
+            last_page_idx = (self.num_base_records - 1) // RECORDS_PER_PAGE
+            if page_index < last_page_idx:
+                page.num_records = RECORDS_PER_PAGE
+            else:
+                count = self.num_base_records % RECORDS_PER_PAGE
+                page.num_records = RECORDS_PER_PAGE if count == 0 else count
+        return pid, page
+
     def update_base_column(self, offset, col_index, value):
         """
         Overwrite a specific column in a base record at 'offset'.
@@ -108,17 +190,28 @@ class PageRange:
             page_index = offset // RECORDS_PER_PAGE
             slot_in_page = offset % RECORDS_PER_PAGE
 
-            pid = self._page_id(False, col_index, page_index)
-            page = self.table.bufferpool.fix_page(pid, mode="w")
-            if page.num_records == 0:
-                last_page_idx = (self.num_base_records - 1) // RECORDS_PER_PAGE
-                if page_index < last_page_idx:
-                    page.num_records = RECORDS_PER_PAGE
-                else:
-                    count = self.num_base_records % RECORDS_PER_PAGE
-                    page.num_records = RECORDS_PER_PAGE if count == 0 else count
+            if col_index == SCHEMA_ENCODING_COLUMN:
+                self._schema_page(page_index).update(slot_in_page, value)
+                return
+
+            pid, page = self._fix_base_page_for_update(col_index, page_index)
             page.update(slot_in_page, value)
             self.table.bufferpool.unfix_page(pid, dirty=True)
+
+    def update_base_metadata(self, offset, schema_encoding, indirection):
+        """
+        Overwrite the schema encoding and indirection of a base record at 'offset'.
+        User columns never change in place: updates go to the tail.
+        """
+        with self.lock:
+            page_index = offset // RECORDS_PER_PAGE
+            slot_in_page = offset % RECORDS_PER_PAGE
+
+            self._schema_page(page_index).update(slot_in_page, schema_encoding)
+
+            pid, page = self._fix_base_page_for_update(INDIRECTION_COLUMN, page_index)
+            page.update(slot_in_page, indirection)
+            self.table.bufferpool.unfix_page(pid, dirty=True)
     
     def write_tail_record(self, record_data):
         """
@@ -164,6 +257,97 @@ class PageRange:
 
             return record_data
 
+    def read_tail_column(self, col_index, offsets):
+        """
+        Read one physical column for many tail records, fixing each tail page once.
+        Returns the values in the same order as offsets.
+        """
+        with self.lock:
+            values = [0] * len(offsets)
+            positions_by_page = {}
+            for position, offset in enumerate(offsets):
+                page_index = offset // RECORDS_PER_PAGE
+                if page_index not in positions_by_page:
+                    positions_by_page[page_index] = []
+                positions_by_page[page_index].append(position)
+
+            for page_index, positions in positions_by_page.items():
+                pid = self._page_id(True, col_index, page_index)
+                page = self.table.bufferpool.fix_page(pid, mode="r")
+                for position in positions:
+                    values[position] = page.read(offsets[position] % RECORDS_PER_PAGE)
+                self.table.bufferpool.unfix_page(pid)
+            return values
+
+
+class PageDirectory:
+    """
+    Maps rid -> (range_idx, is_tail, offset).
+    RIDs are dense integers, so entries live in flat typed arrays indexed by
+    rid instead of a dict of tuples: 9 bytes per rid instead of ~200.
+    """
+    GROW_BY = 4096
+
+    _ABSENT = 0
+    _BASE = 1
+    _TAIL = 2
+
+    def __init__(self):
+        self._range_idx = array('I')
+        self._offset = array('I')
+        self._kind = bytearray()  # _ABSENT / _BASE / _TAIL per rid
+        self._count = 0
+
+    def _grow(self, rid):
+        grow_by = (rid // self.GROW_BY + 1) * self.GROW_BY - len(self._kind)
+        self._range_idx.extend([0] * grow_by)
+        self._offset.extend([0] * grow_by)
+        self._kind.extend(bytes(grow_by))
+
+    def get(self, rid, default=None):
+        if rid < 0 or rid >= len(self._kind):
+            return default
+        kind = self._kind[rid]
+        if kind == self._ABSENT:
+            return default
+        return (self._range_idx[rid], kind == self._TAIL, self._offset[rid])
+
+    def __getitem__(self, rid):
+        loc = self.get(rid)
+        if loc is None:
+            raise KeyError(rid)
+        return loc
+
+    def __setitem__(self, rid, loc):
+        range_idx, is_tail, offset = loc
+        if rid >= len(self._kind):
+            self._grow(rid)
+        if self._kind[rid] == self._ABSENT:
+            self._count += 1
+        self._range_idx[rid] = range_idx
+        self._offset[rid] = offset
+        self._kind[rid] = self._TAIL if is_tail else self._BASE
+
+    def __delitem__(self, rid):
+        if self.get(rid) is None:
+            raise KeyError(rid)
+        self._kind[rid] = self._ABSENT
+        self._count -= 1
+
+    def __contains__(self, rid):
+        return self.get(rid) is not None
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        """Yield (rid, (range_idx, is_tail, offset)) for every present rid"""
+        kinds = self._kind
+        for rid in range(len(kinds)):
+            kind = kinds[rid]
+            if kind != self._ABSENT:
+                yield rid, (self._range_idx[rid], kind == self._TAIL, self._offset[rid])
+
 
 class Table:
 
@@ -178,25 +362,35 @@ class Table:
         self.num_columns = num_columns
         # INDIRECTION, RID, TIMESTAMP, SCHEMA_ENCODING
         self.total_columns = 4 + num_columns
-        self.page_directory = {}
-        self.page_ranges = []
+        self.page_directory = PageDirectory()
+        # Copy-on-write snapshot: appends publish a new tuple by a single reference
+        # assignment, so readers index it without taking page_ranges_lock
+        self.page_ranges = ()
         self.current_page_range = None
         self.current_tail_page_range = None
         self.next_rid = 1
         self.DELETED_RID = DELETED_RID  # if rid is 0 then it is deleted
         self.bufferpool = bufferpool
-        self.index = Index(self, create_index)
 
-        self._rids_to_merge = set()
-        self._rids_to_merge_lock = threading.Lock()
+        # deque append/popleft are atomic, so enqueueing a rid for merge needs no lock;
+        # duplicates are collapsed when the merge drains the queue
+        self._rids_to_merge = deque()
 
         # each shared data structure has a lock
         self.page_directory_lock = threading.RLock()
-        self.page_ranges_lock = threading.RLock()
+        self.page_ranges_lock = threading.RLock()  # guards appends and current_*_page_range
         self.rid_lock = threading.Lock()
         self.updates_counter_lock = threading.Lock()
         
         self.index_lock = threading.RLock()
+
+        # LRU of rid -> (latest user columns, schema encoding). Every write bumps
+        # the generation so readers that raced a writer don't cache stale values.
+        self._latest_cache = OrderedDict()
+        self._latest_cache_gen = 0
+        self._latest_cache_lock = threading.Lock()
+
+        self.index = Index(self, create_index)
         
         # Update-based merge tracking
         self.updates_since_merge = 0
@@ -205,13 +399,14 @@ class Table:
         self._merge_thread = None
         self._merge_thread_stop = threading.Event()  # signals thread to stop
         self._merge_in_progress = threading.Lock()  # prevents concurrent merges
+        self._pending_tps = {}  # (range_idx, page_index) -> tail RID a busy merge could not fold in
+        self._merge_executor = None  # created on the first merge that spans several page ranges
+        self._merge_needed = threading.Event()  # set when the update threshold is crossed (or on stop)
         self._start_merge_thread()
 
         # Transaction support
         self.lock_manager = None
 
-        self._transaction_modifications = []  # Track changes for rollback
-        self._transaction_modifications_lock = threading.Lock()
 
     def __str__(self):
         return f'Table(name="{self.name}", num_columns={self.num_columns}, key={self.key})'
@@ -223,12 +418,17 @@ class Table:
         """Get current page range or create a new one if the current is full."""
         with self.page_ranges_lock:
             if self.current_page_range is None or not self.current_page_range.has_capacity():
-                pr = PageRange(self, len(self.page_ranges))
-                self.page_ranges.append(pr)
-                self.current_page_range = pr
+                self.current_page_range = self.add_page_range()
             return self.current_page_range
 
-    def insert(self, *columns):
+    def add_page_range(self):
+        """Append a new PageRange and publish the new page_ranges snapshot."""
+        with self.page_ranges_lock:
+            pr = PageRange(self, len(self.page_ranges))
+            self.page_ranges = self.page_ranges + (pr,)
+            return pr
+
+    def insert(self, *columns, transaction=None):
         """
         Insert a new base record and return the RID of the inserted record.
         """
@@ -237,7 +437,7 @@ class Table:
 
         with self.index_lock:
             # enforce unique primary key
-            if self.index.locate(self.key, columns[self.key]):
+            if self.index.contains(self.key, columns[self.key]):
                 raise ValueError(
                     f"Duplicate entry for primary key column {self.key} with value {columns[self.key]}"
                 )
@@ -260,13 +460,10 @@ class Table:
             with self.page_directory_lock:
                 self.page_directory[rid] = (page_range.range_idx, False, offset)
 
-            for col_num in range(self.num_columns):
-                if self.index.indices[col_num] is not None:
-                    value = columns[col_num]
-                    self.index.insert(col_num, value, rid)
+            self.index.insert_row(rid, columns)
 
             # Record modification for potential rollback
-            self.record_modification(rid, 'insert', new_data=full_record)
+            self.record_modification(rid, 'insert', transaction, new_data=full_record)
 
             return rid
 
@@ -283,8 +480,7 @@ class Table:
 
         range_idx, is_tail, offset = loc
         
-        with self.page_ranges_lock:
-            page_range = self.page_ranges[range_idx]
+        page_range = self.page_ranges[range_idx]
 
         with page_range.lock:  # lock for the current page range (not whole table)
             if not is_tail:
@@ -297,32 +493,117 @@ class Table:
 
         return record_data
     
-    def get_latest_version(self, rid):
+    def get_latest_version(self, rid, base_record=None):
         """
         Get the latest version of a record by following the indirection chain.
+        Callers that already hold the base record can pass it to skip re-reading it.
 
         Returns (user_columns_list, schema_encoding).
         NOTE: This version ignores TPS for simplicity and correctness.
         """
-        base_record = self.read_record(rid)
+        with self._latest_cache_lock:
+            cached = self._latest_cache.get(rid)
+            if cached is not None:
+                self._latest_cache.move_to_end(rid)
+                return cached
+            gen = self._latest_cache_gen
+
         if base_record is None:
-            return None, None
+            base_record = self.read_record(rid)
+            if base_record is None:
+                return None, None
+        else:
+            # the caller read base_record before our generation snapshot,
+            # so the result can't be proven fresh enough to cache
+            gen = -1
 
         indirection_rid = base_record[INDIRECTION_COLUMN]
 
         # If there's no tail chain, the base record is the latest
         if indirection_rid == DELETED_RID:
-            return base_record[4:], base_record[SCHEMA_ENCODING_COLUMN]
+            latest = base_record
+        else:
+            # Otherwise, follow the pointer to the latest tail record
+            latest = self.read_record(indirection_rid)
+            if latest is None:
+                # if something went wrong, return base
+                latest = base_record
 
-        # Otherwise, follow the pointer to the latest tail record
-        tail_record = self.read_record(indirection_rid)
-        if tail_record is None:
-            # if something went wrong, return base
-            return base_record[4:], base_record[SCHEMA_ENCODING_COLUMN]
+        return self._remember_latest(rid, latest[4:], latest[SCHEMA_ENCODING_COLUMN], gen)
 
-        return tail_record[4:], tail_record[SCHEMA_ENCODING_COLUMN]
+    def _remember_latest(self, rid, values, schema_encoding, gen=None):
+        """
+        Cache the latest version of rid and return it as (values, schema_encoding).
+        Writers pass gen=None, which invalidates every in-flight read; readers pass
+        the generation they started at and are dropped if a write happened since.
+        """
+        latest = (values, schema_encoding)
+        with self._latest_cache_lock:
+            if gen is None:
+                self._latest_cache_gen += 1
+            elif gen != self._latest_cache_gen:
+                return latest
+            self._latest_cache[rid] = latest
+            self._latest_cache.move_to_end(rid)
+            if len(self._latest_cache) > LATEST_VERSION_CACHE_SIZE:
+                self._latest_cache.popitem(last=False)
+        return latest
+
+    def _forget_latest(self, rid):
+        """Drop rid from the latest-version cache after a delete or rollback"""
+        with self._latest_cache_lock:
+            self._latest_cache_gen += 1
+            self._latest_cache.pop(rid, None)
         
-    def update_record(self, rid, *columns):
+    def scan_column(self, column_number):
+        """
+        Read the latest value of one user column for every live base record.
+        Base pages are read a column at a time (RID, indirection and the
+        requested column only). Records with a tail chain take the column from
+        their latest tail record, read in one batch per page range so each tail
+        page is fixed once rather than once per record.
+
+        Returns (rids, values) as two parallel lists.
+        """
+        rids = []
+        values = []
+        # tail range_idx -> (positions in values, tail offsets) still to be read
+        pending_tails = {}
+        page_ranges = self.page_ranges
+
+        for page_range in page_ranges:
+            num_pages = -(-page_range.num_base_records // RECORDS_PER_PAGE)
+            for page_index in range(num_pages):
+                with page_range.lock:
+                    page_rids = page_range.read_base_column_page(RID_COLUMN, page_index)
+                    indirections = page_range.read_base_column_page(INDIRECTION_COLUMN, page_index)
+                    page_values = page_range.read_base_column_page(4 + column_number, page_index)
+
+                with self.page_directory_lock:
+                    for rid, indirection, value in zip(page_rids, indirections, page_values):
+                        if rid == DELETED_RID:
+                            continue
+                        if indirection != DELETED_RID:
+                            loc = self.page_directory.get(indirection)
+                            if loc is not None:
+                                tail_range_idx, _, tail_offset = loc
+                                if tail_range_idx not in pending_tails:
+                                    pending_tails[tail_range_idx] = ([], [])
+                                positions, offsets = pending_tails[tail_range_idx]
+                                positions.append(len(values))
+                                offsets.append(tail_offset)
+                        rids.append(rid)
+                        values.append(value)
+
+        for tail_range_idx, (positions, offsets) in pending_tails.items():
+            page_range = self.page_ranges[tail_range_idx]
+            tail_values = page_range.read_tail_column(4 + column_number, offsets)
+            for position, value in zip(positions, tail_values):
+                values[position] = value
+
+        return rids, values
+
+    def update_record(self, rid, *columns, transaction=None):
         """
         Update a record by creating a new tail record.
         'columns' is a list where None means no change for that column.
@@ -332,9 +613,9 @@ class Table:
             return False
 
         # Record old state before modification
-        self.record_modification(rid, 'update', old_data=base_record.copy())
+        self.record_modification(rid, 'update', transaction, old_data=base_record.copy())
 
-        latest_values, current_schema = self.get_latest_version(rid)
+        latest_values, current_schema = self.get_latest_version(rid, base_record)
 
         with self.rid_lock:
             tail_rid = self.next_rid
@@ -343,12 +624,10 @@ class Table:
         prev_tail_rid = base_record[INDIRECTION_COLUMN]
 
         new_schema = current_schema
-        updated_columns_info = []  # (col_index, old_val, new_val)
 
         for i, value in enumerate(columns):
             if value is not None:
                 new_schema |= (1 << i)
-                updated_columns_info.append((i, latest_values[i], value))
 
         # build tail record [meta] + [user columns]
         tail_data = [prev_tail_rid, tail_rid, int(time()), new_schema]
@@ -376,30 +655,29 @@ class Table:
         
         assert not is_tail
         
-        with self.page_ranges_lock:
-            base_pr = self.page_ranges[base_range_idx]
+        base_pr = self.page_ranges[base_range_idx]
 
-        with base_pr.lock:
-            # update indirection and schema-encoding on base record
-            base_pr.update_base_column(base_offset, INDIRECTION_COLUMN, tail_rid)
-            base_pr.update_base_column(base_offset, SCHEMA_ENCODING_COLUMN, new_schema)
+        # update indirection and schema-encoding on base record
+        base_pr.update_base_metadata(base_offset, new_schema, tail_rid)
+        self._remember_latest(rid, tail_data[4:], new_schema)
 
         # update all relevant secondary indexes
         with self.index_lock:
-            for col_num, old_value, new_value in updated_columns_info:
-                if self.index.indices[col_num] is not None:
-                    self.index.update(col_num, old_value, new_value, rid)
+            self.index.update_row(rid, latest_values, columns)
 
-        with self._rids_to_merge_lock:
-            self._rids_to_merge.add(rid)
+        self._rids_to_merge.append(rid)
 
         # increment update counter for merge tracking
         with self.updates_counter_lock:
             self.updates_since_merge += 1
+            merge_due = self.updates_since_merge >= MERGE_THRESHOLD_UPDATES
+
+        if merge_due:
+            self._merge_needed.set()
 
         return True
 
-    def delete_record(self, rid):
+    def delete_record(self, rid, transaction=None):
         """
         Mark a record as deleted by setting RID to DELETED_RID in the base record
         and remove it from all indexes.
@@ -415,7 +693,7 @@ class Table:
             return False
 
         # Record old state before deletion
-        self.record_modification(rid, 'delete', old_data=base_record.copy())
+        self.record_modification(rid, 'delete', transaction, old_data=base_record.copy())
 
         range_idx, is_tail, offset = loc
         if is_tail:
@@ -423,22 +701,19 @@ class Table:
             return False
 
         # get latest version to ensure we have the correct values for index deletion
-        latest_values, _ = self.get_latest_version(rid)
+        latest_values, _ = self.get_latest_version(rid, base_record)
         if latest_values is None:
             return False
 
-        with self.page_ranges_lock:
-            pr = self.page_ranges[range_idx]
+        pr = self.page_ranges[range_idx]
         
         with pr.lock:
             pr.update_base_column(offset, RID_COLUMN, self.DELETED_RID)
+        self._forget_latest(rid)
 
         # drop from indexes using latest values
         with self.index_lock:
-            for col_num in range(self.num_columns):
-                if self.index.indices[col_num] is not None:
-                    value = latest_values[col_num]
-                    self.index.delete(col_num, value, rid)
+            self.index.delete_row(rid, latest_values)
 
         return True
     
@@ -454,7 +729,7 @@ class Table:
             return None, None
 
         if relative_version == 0:
-            return self.get_latest_version(rid)
+            return self.get_latest_version(rid, base_record)
 
         # start from latest tail record
         tail_rid = base_record[INDIRECTION_COLUMN]
@@ -483,25 +758,27 @@ class Table:
     def __merge(self):
         """
         Simple, in-place merge:
-        - For each base record in each PageRange:
-          * compute the latest values using get_latest_version()
-          * overwrite the user columns + schema encoding in the base pages
-          * update TPS on the base page to reflect the merged tail RID
+        - Group the queued base records by PageRange and base page
+        - Without holding the range lock, find the newest tail RID on each page
+        - Take each PageRange's lock once and advance every page's TPS to it
+        Page ranges are independent, so several are merged in parallel.
         """
-        with self._rids_to_merge_lock:
-            rids_to_merge = self._rids_to_merge.copy()
-            self._rids_to_merge.clear()
+        rids_to_merge = set()
+        pop_rid = self._rids_to_merge.popleft
+        while True:
+            try:
+                rids_to_merge.add(pop_rid())
+            except IndexError:
+                break
+
+        # TPS targets left over from merges that found their range busy
+        pending_tps, self._pending_tps = self._pending_tps, {}
 
-        if not rids_to_merge:
+        if not rids_to_merge and not pending_tps:
             return
 
-        with self.page_ranges_lock:
-            # Capture current tail range at start to avoid cleaning it
-            start_tail_range = self.current_tail_page_range
         # print("MERGE")
 
-        merged_ranges = set()
-
         # Group RIDs by their page range
         rids_by_range = {}
         with self.page_directory_lock:
@@ -516,80 +793,100 @@ class Table:
                     rids_by_range[range_idx] = []
                 rids_by_range[range_idx].append((rid, offset))
 
-        with self.page_ranges_lock:
-            page_ranges_list = list(self.page_ranges)
-
-        for range_idx, rid_offset_list in rids_by_range.items():
-            if range_idx >= len(page_ranges_list):
-                continue
-            page_range = page_ranges_list[range_idx]
-
-            acquired = page_range.lock.acquire(blocking=False)
-            if not acquired:
-                # Put RIDs back for next merge cycle
-                with self._rids_to_merge_lock:
-                    for rid, _ in rid_offset_list:
-                        self._rids_to_merge.add(rid)
-                continue
-
-            merged_ranges.add(page_range)
-
-            try:
-                for rid, offset in rid_offset_list:
-                    page_index = offset // RECORDS_PER_PAGE
-
-                    # Read base record directly (we already hold the lock)
-                    base_record = page_range.read_base_record(offset)
-                    if not base_record:
-                        continue
-
-                    base_rid = base_record[RID_COLUMN]
-                    tail_rid = base_record[INDIRECTION_COLUMN]
-
-                    if base_rid == self.DELETED_RID or base_rid == DELETED_RID:
-                        continue
-
-                    if tail_rid == DELETED_RID:
-                        continue  # no tail to merge
+        pending_by_range = {}
+        for (range_idx, page_index), observed_tail in pending_tps.items():
+            pending_by_range.setdefault(range_idx, {})[page_index] = observed_tail
 
-                    # Check TPS
-                    pid = page_range._page_id(False, RID_COLUMN, page_index)
-                    page = self.bufferpool.fix_page(pid, mode="r")
-                    current_tps = page.get_tps()
-                    self.bufferpool.unfix_page(pid)
-
-                    if tail_rid <= current_tps:
-                        continue  # already merged
-
-                    # Need to release lock before calling get_latest_version to avoid potential deadlock w/ other page ranges
-                    page_range.lock.release()
-
-                    latest_values, schema_encoding = self.get_latest_version(rid)
+        tasks = [
+            (range_idx, rids_by_range.get(range_idx, ()), pending_by_range.get(range_idx, {}))
+            for range_idx in rids_by_range.keys() | pending_by_range.keys()
+        ]
+        if len(tasks) == 1:
+            self._merge_single_range(*tasks[0])
+        else:
+            # list() waits for every range and re-raises a worker's exception here
+            list(self._get_merge_executor().map(lambda task: self._merge_single_range(*task), tasks))
 
-                    # Reacquire lock
-                    page_range.lock.acquire()
+        # NOTE: Tail records are intentionally NOT deleted after merge
+        # to preserve historical versions for select_version queries.
+        # The merge only consolidates values into base records for faster reads.
 
-                    if latest_values is None:
-                        continue
+    def _get_merge_executor(self):
+        if self._merge_executor is None:
+            self._merge_executor = ThreadPoolExecutor(max_workers=MERGE_WORKERS)
+        return self._merge_executor
 
-                    # NOTE: We intentionally do NOT copy values into base record
-                    # to preserve original values for historical version queries.
-                    # The base record keeps its original values; latest values
-                    # are always retrieved by following the tail chain.
+    def _merge_single_range(self, range_idx, rid_offset_list, pending_tps):
+        """
+        Merge one page range: advance each base page's TPS to the newest tail RID
+        of the queued records on it, plus any targets deferred by earlier merges.
+        """
+        page_ranges_list = self.page_ranges
+        if range_idx >= len(page_ranges_list):
+            return
+        page_range = page_ranges_list[range_idx]
+
+        # Group this range's RIDs by base page, keeping their slots on the page
+        slots_by_page = {}
+        for rid, offset in rid_offset_list:
+            slots_by_page.setdefault(offset // RECORDS_PER_PAGE, []).append(offset % RECORDS_PER_PAGE)
+
+        # Read-only pre-pass outside the range lock: the newest tail RID of every
+        # live record queued on each page is what that page's TPS advances to.
+        # A stale read only lowers a target: the update that wrote a newer tail RID queues
+        # the record again, so the next merge advances past it.
+        newest_tail_by_page = {}
+        for page_index, slots in slots_by_page.items():
+            page_rids = page_range._read_base_column_page(RID_COLUMN, page_index)
+            indirections = page_range._read_base_column_page(INDIRECTION_COLUMN, page_index)
+            newest_tail = max(
+                (indirections[slot] for slot in slots if page_rids[slot] != DELETED_RID),
+                default=DELETED_RID,
+            )
+            if newest_tail != DELETED_RID:
+                newest_tail_by_page[page_index] = newest_tail
+
+        # Fold in targets deferred by earlier merges that found this range busy
+        for page_index, observed_tail in pending_tps.items():
+            if observed_tail > newest_tail_by_page.get(page_index, DELETED_RID):
+                newest_tail_by_page[page_index] = observed_tail
+
+        # Drop pages whose TPS already covers their target, still without the range lock,
+        # so the lock is only taken when some page really has to advance
+        for page_index in list(newest_tail_by_page):
+            pid = page_range._page_id(False, RID_COLUMN, page_index)
+            page = self.bufferpool.fix_page(pid, mode="r")
+            current_tps = page.get_tps()
+            self.bufferpool.unfix_page(pid)
+            if current_tps >= newest_tail_by_page[page_index]:
+                del newest_tail_by_page[page_index]
+
+        if not newest_tail_by_page:
+            return
 
-                    # Update TPS
-                    pid = page_range._page_id(False, RID_COLUMN, page_index)
-                    page = self.bufferpool.fix_page(pid, mode="w")
-                    current_tps = page.get_tps()
-                    if tail_rid > current_tps:
-                        page.set_tps(tail_rid)
-                    self.bufferpool.unfix_page(pid, dirty=True)
-            finally:
-                page_range.lock.release()
+        acquired = page_range.lock.acquire(blocking=False)
+        if not acquired:
+            # Remember the tail RIDs this merge meant to fold in instead of requeueing every rid
+            for page_index, newest_tail in newest_tail_by_page.items():
+                self._pending_tps[(range_idx, page_index)] = newest_tail
+            return
 
-        # NOTE: Tail records are intentionally NOT deleted after merge
-        # to preserve historical versions for select_version queries.
-        # The merge only consolidates values into base records for faster reads.
+        try:
+            # NOTE: We intentionally do NOT copy values into base record
+            # to preserve original values for historical version queries.
+            # The base record keeps its original values; latest values
+            # are always retrieved by following the tail chain.
+
+            # Update TPS once per page
+            for page_index, newest_tail in newest_tail_by_page.items():
+                pid = page_range._page_id(False, RID_COLUMN, page_index)
+                page = self.bufferpool.fix_page(pid, mode="w")
+                advanced = newest_tail > page.get_tps()
+                if advanced:
+                    page.set_tps(newest_tail)
+                self.bufferpool.unfix_page(pid, dirty=advanced)
+        finally:
+            page_range.lock.release()
 
     def merge(self):
         """Public method to trigger merge"""
@@ -612,44 +909,41 @@ class Table:
             self._merge_thread.start()
     
     def _merge_thread_worker(self):
-        """Background thread worker that periodically checks if merge is needed"""
-        while not self._merge_thread_stop.is_set():
-            # check if merge is needed
-            should_merge = False
-            with self.updates_counter_lock:
-                if self.updates_since_merge >= MERGE_THRESHOLD_UPDATES:
-                    should_merge = True
-            
-            if should_merge:
-                self.merge()
-            
-            # sleep for the check interval but wake up early if stop is signaled
-            self._merge_thread_stop.wait(timeout=MERGE_CHECK_INTERVAL)
+        """Background thread worker that sleeps until update_record signals a merge is needed"""
+        while True:
+            self._merge_needed.wait()
+            if self._merge_thread_stop.is_set():
+                break
+            self._merge_needed.clear()
+            self.merge()
     
     def stop_merge_thread(self):
         """Stop the background merge thread when table/db is closing"""
         if self._merge_thread is not None:
             self._merge_thread_stop.set()
+            self._merge_needed.set()  # wake the worker so it sees the stop flag
             self._merge_thread.join(timeout=5.0)  # wait to finish
             self._merge_thread = None
-
-    def record_modification(self, rid, modification_type, transaction_id=None, old_data=None, new_data=None):
-        """Record a modification for potential rollback"""
-        with self._transaction_modifications_lock:
-            self._transaction_modifications.append({
-                'transaction_id': transaction_id,
-                'rid': rid,
-                'type': modification_type,
-                'old_data': old_data,
-                'new_data': new_data
-            })
+        if self._merge_executor is not None:
+            self._merge_executor.shutdown(wait=True)
+            self._merge_executor = None
+
+    def record_modification(self, rid, modification_type, transaction=None, old_data=None, new_data=None):
+        """Record a modification in the transaction's own rollback log"""
+        if transaction is None:
+            return  # outside a transaction there is nothing to roll back to
+        modifications = transaction.modifications_by_table.get(self)
+        if modifications is None:
+            modifications = transaction.modifications_by_table[self] = []
+        modifications.append({
+            'rid': rid,
+            'type': modification_type,
+            'old_data': old_data,
+            'new_data': new_data
+        })
     
-    def rollback_modifications(self, transaction_id):
-        """Rollback all recorded modifications for a specific transaction"""
-        with self._transaction_modifications_lock:
-            # Filter to only this transaction's modifications (this list notation is insane)
-            modifications = [m for m in self._transaction_modifications if m['transaction_id'] == transaction_id]
-            self._transaction_modifications = [m for m in self._transaction_modifications if m['transaction_id'] != transaction_id]
+    def rollback_modifications(self, modifications):
+        """Rollback a transaction's recorded modifications on this table"""
         
         # Rollback in reverse order
         for mod in reversed(modifications):
@@ -663,21 +957,15 @@ class Table:
                     if loc:
                         range_idx, is_tail, offset = loc
 
-                        with self.page_ranges_lock:
-                            page_range = self.page_ranges[range_idx]
+                        page_range = self.page_ranges[range_idx]
                         with page_range.lock:
                             page_range.update_base_column(offset, RID_COLUMN, self.DELETED_RID)
+                        self._forget_latest(rid)
                         
-                        # Remove from all indexes
-                        try:
-                            latest_values, _ = self.get_latest_version(rid)
-                            if latest_values:
-                                for col_num in range(self.num_columns):
-                                    if self.index.indices[col_num] is not None:
-                                        value = latest_values[col_num]
-                                        self.index.delete(col_num, value, rid)
-                        except Exception:
-                            pass
+                        # Remove from all indexes; later updates by this transaction were already
+                        # rolled back, so the record holds the values it was inserted with
+                        with self.index_lock:
+                            self.index.delete_row(rid, mod['new_data'][4:])
                         
                         # Remove from page_directory
                         with self.page_directory_lock:
@@ -693,29 +981,34 @@ class Table:
                             loc = self.page_directory.get(rid)
                         if loc:
                             range_idx, is_tail, offset = loc
-                            with self.page_ranges_lock:
-                                page_range = self.page_ranges[range_idx]
+                            page_range = self.page_ranges[range_idx]
+                            # values the aborted update produced, still in the index
+                            aborted_values, aborted_schema = self.get_latest_version(rid)
                             
-                            # Restore base record columns (skip metadata)
-                            with page_range.lock:
-                                for col_idx in range(4, len(old_data)):
-                                    page_range.update_base_column(offset, col_idx, old_data[col_idx])
-                                
-                                # Restore indirection and schema encoding
-                                page_range.update_base_column(offset, INDIRECTION_COLUMN, old_data[INDIRECTION_COLUMN])
-                                page_range.update_base_column(offset, SCHEMA_ENCODING_COLUMN, old_data[SCHEMA_ENCODING_COLUMN])
-                        try:
-                            current_values, _ = self.get_latest_version(rid)
-                            if current_values and old_data and len(old_data) > 4:
-                                old_user_columns = old_data[4:]
-                                for col_num in range(self.num_columns):
-                                    if self.index.indices[col_num] is not None:
-                                        old_value = old_user_columns[col_num]
-                                        new_value = current_values[col_num]
-                                        if old_value != new_value:
-                                            self.index.update(col_num, new_value, old_value, rid)
-                        except Exception:
-                            pass
+                            # An update only touched the base record's indirection and schema
+                            # encoding (user columns live in the tail), so restore just those
+                            page_range.update_base_metadata(
+                                offset,
+                                old_data[SCHEMA_ENCODING_COLUMN],
+                                old_data[INDIRECTION_COLUMN],
+                            )
+                            self._forget_latest(rid)
+                            try:
+                                restored_values, _ = self.get_latest_version(rid)
+                                if aborted_values and restored_values:
+                                    # only columns that were ever updated and are indexed can differ
+                                    mask = aborted_schema & self.index.indexed_mask
+                                    with self.index_lock:
+                                        while mask:
+                                            bit = mask & -mask
+                                            mask ^= bit
+                                            col_num = bit.bit_length() - 1
+                                            aborted_value = aborted_values[col_num]
+                                            restored_value = restored_values[col_num]
+                                            if aborted_value != restored_value:
+                                                self.index.update(col_num, aborted_value, restored_value, rid)
+                            except Exception:
+                                pass
                 
                 elif mod['type'] == 'delete':
                     # Restore deleted record by clearing DELETED_RID marker
@@ -727,20 +1020,18 @@ class Table:
                     if loc:
                         range_idx, is_tail, offset = loc
                         if not is_tail:
-                            with self.page_ranges_lock:
-                                page_range = self.page_ranges[range_idx]
+                            page_range = self.page_ranges[range_idx]
                             with page_range.lock:
                                 # Restore RID column to original rid
                                 page_range.update_base_column(offset, RID_COLUMN, old_data[RID_COLUMN])
+                            self._forget_latest(rid)
                             
-                            # Re-add to indexes with original values
+                            # Re-add to indexes with the record's latest values
                             try:
-                                if old_data and len(old_data) > 4:
-                                    user_columns = old_data[4:]
-                                    for col_num in range(self.num_columns):
-                                        if self.index.indices[col_num] is not None:
-                                            value = user_columns[col_num]
-                                            self.index.insert(col_num, value, rid)
+                                restored_values, _ = self.get_latest_version(rid)
+                                if restored_values:
+                                    with self.index_lock:
+                                        self.index.insert_row(rid, restored_values)
                             except Exception:
                                 pass
             except Exception as e:
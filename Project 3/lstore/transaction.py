@@ -1,6 +1,70 @@
 from lstore.lock_manager import LockType, LockManager
+from collections import deque
+from enum import IntEnum
+import itertools
+import random
 import time
-from lstore.config import MAX_RETRIES, RETRY_DELAY, RETRY_BACKOFF_MULTIPLIER, MAX_RETRY_DELAY
+from lstore.config import MAX_RETRIES, RETRY_DELAY, MAX_RETRY_DELAY, TRANSACTION_ERROR_LOG_SIZE
+
+# Source of transaction ids: every attempt, including each retry, gets a fresh one
+_TRANSACTION_IDS = itertools.count(1)
+
+
+class QueryType(IntEnum):
+    OTHER = 0
+    SELECT = 1
+    UPDATE = 2
+    INSERT = 3
+    DELETE = 4
+    SUM = 5
+
+
+_QUERY_TYPES = {
+    'select': QueryType.SELECT,
+    'update': QueryType.UPDATE,
+    'insert': QueryType.INSERT,
+    'delete': QueryType.DELETE,
+    'sum': QueryType.SUM,
+}
+
+
+def _no_locks(table, args):
+    return []
+
+
+def _select_locks(table, args):
+    # SELECT needs shared locks
+    search_key, search_key_index, projected_columns = args
+    return [(rid, LockType.SHARED) for rid in table.index.locate(search_key_index, search_key)]
+
+
+def _update_locks(table, args):
+    # UPDATE needs exclusive locks
+    primary_key, *columns = args
+    return [(rid, LockType.EXCLUSIVE) for rid in table.index.locate(table.key, primary_key)]
+
+
+def _insert_locks(table, args):
+    # INSERT: lock on the primary key instead of the whole table
+    # args = columns passed to Query.insert(*columns)
+    primary_key_value = args[table.key]
+    return [(f"insert_pk_{table.name}_{primary_key_value}", LockType.EXCLUSIVE)]
+
+
+def _delete_locks(table, args):
+    # DELETE needs exclusive locks
+    primary_key = args[0]
+    return [(rid, LockType.EXCLUSIVE) for rid in table.index.locate(table.key, primary_key)]
+
+
+def _sum_locks(table, args):
+    # SUM needs shared locks on the range
+    start_range, end_range, aggregate_column_index = args
+    return [(rid, LockType.SHARED) for rid in table.index.locate_range(start_range, end_range, table.key)]
+
+
+# Indexed by QueryType
+_LOCK_HANDLERS = [_no_locks, _select_locks, _update_locks, _insert_locks, _delete_locks, _sum_locks]
 
 
 class Transaction:
@@ -14,11 +78,17 @@ class Transaction:
         self._provided_lock_manager = lock_manager  # Store if explicitly provided
         self.lock_manager = lock_manager  # May be None initially
         self.acquired_locks = set()  # (record_id, lock_type)
-        self.modifications = []  
-        self.transaction_id = id(self)
+        self._lock_plan = None  # locks to take, resolved at the start of each attempt
+        self.transaction_id = next(_TRANSACTION_IDS)
+        # Rollback log kept on the transaction itself: table -> modifications in the order made.
+        # Only the thread running this transaction touches it, so it needs no lock.
+        self.modifications_by_table = {}
         self.tables_modified = set()  # Track which tables were modified
         self.max_retries = MAX_RETRIES  # Maximum retry attempts
-        self.retry_delay = RETRY_DELAY  # Initial delay in seconds (10ms)
+        self.retry_delay = RETRY_DELAY  # Shortest backoff slot in seconds (10ms)
+        # Most recent failures, kept for inspection instead of printed: printing from many
+        # threads serialises on stdout. Survives retries.
+        self.errors = deque(maxlen=TRANSACTION_ERROR_LOG_SIZE)
 
     def add_query(self, query, table, *args):
         """
@@ -28,8 +98,11 @@ class Transaction:
         t = Transaction()
         t.add_query(q.update, grades_table, 0, *[None, 1, None, 2, None])
         """
-        self.queries.append((query, table, args))
+        # resolve the query's type once here instead of on every run and retry
+        query_type = _QUERY_TYPES.get(getattr(query, '__name__', None), QueryType.OTHER)
+        self.queries.append((query, table, args, query_type))
         self.tables_modified.add(table)
+        self._lock_plan = None
 
     def run(self, auto_retry=True):
         """
@@ -49,13 +122,14 @@ class Transaction:
             # Legacy behavior: single attempt
             if self.lock_manager is None:
                 return self._run_without_locking()
-            return self._run_with_locking()
+            return self._run_with_locking() is True
         
-        # Retry loop with exponential backoff
+        # Retry loop with slot backoff: the slot is one attempt's duration
         retry_count = 0
-        current_delay = self.retry_delay
+        slot_time = None
         
         while retry_count < self.max_retries:
+            attempt_start = time.perf_counter()
             try:
                 if self.lock_manager is None:
                     result = self._run_without_locking()
@@ -63,30 +137,29 @@ class Transaction:
                     result = self._run_with_locking()
                 
                 # If commit succeeded, return True
-                if result:
+                if result is True:
                     return True
-                
-                # Transaction aborted, prepare for retry
+
+                # Transaction aborted, prepare for retry. A query that returned False is retried
+                # too: under concurrency its record may just have been deleted or not inserted yet
                 retry_count += 1
                 if retry_count >= self.max_retries:
-                    print(f"Transaction {self.transaction_id} failed after {self.max_retries} retries")
+                    self.errors.append(f"Transaction {self.transaction_id} failed after {self.max_retries} retries")
                     return False
                 
-                # Exponential backoff with jitter
-                time.sleep(current_delay + (time.time() % 0.001))
-                current_delay = min(current_delay * RETRY_BACKOFF_MULTIPLIER, MAX_RETRY_DELAY)  # Cap at 1 second
+                # Competing transactions take about as long as this one, so wait a random
+                # whole number of attempt-lengths; the window widens by one slot per retry
+                if slot_time is None:
+                    slot_time = max(time.perf_counter() - attempt_start, self.retry_delay)
+                time.sleep(min(slot_time * random.randint(1, retry_count), MAX_RETRY_DELAY))  # Cap at 1 second
                 
                 # Reset transaction state for retry
                 self._reset_for_retry()
                 
             except Exception as e:
-                print(f"Transaction error: {e}")
-                retry_count += 1
-                if retry_count >= self.max_retries:
-                    return False
-                time.sleep(current_delay)
-                current_delay = min(current_delay * RETRY_BACKOFF_MULTIPLIER, MAX_RETRY_DELAY)
-                self._reset_for_retry()
+                # A bug in the transaction machinery itself, not a failed query: retrying would not help
+                self.errors.append(f"Transaction error: {e!r}")
+                return self.abort()
         
         return False
 
@@ -94,20 +167,23 @@ class Transaction:
         """Reset transaction state for a retry attempt"""
         self._aborted = False
         self.acquired_locks = set()
-        self.modifications = []
-        # Reset transaction ID to get new lock identifiers
-        self.transaction_id = id(self)
+        self.modifications_by_table = {}
+        # Records may have been deleted or re-inserted under new rids since the last attempt,
+        # so the lock plan is resolved again
+        self._lock_plan = None
+        # New id so nothing left over from the aborted attempt can be mistaken for this one
+        self.transaction_id = next(_TRANSACTION_IDS)
         # Note: queries and tables_modified remain the same
 
     def _run_without_locking(self):
         """Run transaction without locking (original behavior)"""
-        for query, table, args in self.queries:
+        for query, table, args, _query_type in self.queries:
             try:
-                result = query(*args)
+                result = query(*args, transaction=self)
                 if result == False:
                     return self.abort()
             except Exception as e:
-                print(f"Transaction error: {e}")
+                self.errors.append(f"Transaction error: {e!r}")
                 return self.abort()
         return self.commit()
 
@@ -130,16 +206,11 @@ class Transaction:
                 table.lock_manager = self.lock_manager
             
             # Phase 1: Acquire all locks (GROW PHASE)
-            for query, table, args in self.queries:
-                # Set transaction_id on query object if it's a Query instance
-                if hasattr(query, '__self__') and hasattr(query.__self__, 'transaction_id'):
-                    query.__self__.transaction_id = self.transaction_id
-                
-                if not self._acquire_locks_for_query(query, table, args):
-                    return self.abort()
+            if not self._acquire_locks():
+                return self.abort()
             
             # Phase 2: Execute all operations (EXECUTION PHASE)
-            for idx, (query, table, args) in enumerate(self.queries):
+            for query, table, args, _query_type in self.queries:
                 # pass the entire transaction context so each thread can use it
                 result = query(*args, transaction=self)
                 
@@ -150,87 +221,37 @@ class Transaction:
             return self.commit()
         
         except Exception as e:
-            print(f"Transaction error with locking: {e}")
+            self.errors.append(f"Transaction error with locking: {e!r}")
             return self.abort()
 
-    def _acquire_locks_for_query(self, query, table, args):
-        """Acquire necessary locks for a query"""
-        records_to_lock = self._get_records_for_query(query, table, args)
-        
-        for record_id, lock_type in records_to_lock:
+    def _acquire_locks(self):
+        """Acquire every lock the transaction needs, in a canonical order"""
+        for record_id, lock_type in self._get_lock_plan():
             if not self.lock_manager.acquire_lock(self.transaction_id, record_id, lock_type):
                 return False
             self.acquired_locks.add((record_id, lock_type))
         
         return True
 
-    def _get_records_for_query(self, query, table, args):
-        """Determine which records and lock types are needed for a query"""
-        records = []
-        
-        query_func = query
-        if hasattr(query, '__name__'):
-            query_name = query.__name__
-        else:
-            # Handle case where it's a bound method
-            query_name = query.__func__.__name__
-        
-        if query_name == 'select':
-            # SELECT needs shared locks
-            search_key, search_key_index, projected_columns = args
-            rids = table.index.locate(search_key_index, search_key)
-            for rid in rids:
-                records.append((rid, LockType.SHARED))
-        
-        elif query_name == 'update':
-            # UPDATE needs exclusive locks
-            primary_key, *columns = args
-            rids = table.index.locate(table.key, primary_key)
-            for rid in rids:
-                records.append((rid, LockType.EXCLUSIVE))
-        
-        elif query_name == 'insert':
-            # INSERT: lock on the primary key instead of the whole table
-            # args = columns passed to Query.insert(*columns)
-            primary_key_value = args[table.key]
-            pk_lock_id = f"insert_pk_{table.name}_{primary_key_value}"
-            records.append((pk_lock_id, LockType.EXCLUSIVE))
-
-        elif query_name == 'delete':
-            # DELETE needs exclusive locks
-            primary_key = args[0]
-            rids = table.index.locate(table.key, primary_key)
-            for rid in rids:
-                records.append((rid, LockType.EXCLUSIVE))
-        
-        elif query_name == 'sum':
-            # SUM needs shared locks on the range
-            start_range, end_range, aggregate_column_index = args
-            rids = table.index.locate_range(start_range, end_range, table.key)
-            for rid in rids:
-                records.append((rid, LockType.SHARED))
-        
-        return records
+    def _get_lock_plan(self):
+        """
+        Resolve the locks for all queries once per attempt: the strongest lock type per
+        record, sorted by record id so transactions touching the same records take them
+        in the same order.
+        """
+        if self._lock_plan is None:
+            strongest = {}
+            for query, table, args, query_type in self.queries:
+                for record_id, lock_type in self._get_records_for_query(query_type, table, args):
+                    current = strongest.get(record_id)
+                    if current is None or lock_type.value > current.value:
+                        strongest[record_id] = lock_type
+            self._lock_plan = sorted(strongest.items(), key=lambda item: str(item[0]))
+        return self._lock_plan
 
-    def _record_pre_modification_state(self, query, table, args):
-        """Record state before modification for potential rollback"""
-        query_name = query.__name__
-        
-        if query_name == 'update':
-            primary_key = args[0]
-            rids = table.index.locate(table.key, primary_key)
-            for rid in rids:
-                current_data = table.read_record(rid)
-                if current_data:
-                    self.modifications.append((table, rid, current_data.copy()))
-        
-        elif query_name == 'delete':
-            primary_key = args[0]
-            rids = table.index.locate(table.key, primary_key)
-            for rid in rids:
-                current_data = table.read_record(rid)
-                if current_data:
-                    self.modifications.append((table, rid, current_data.copy()))
+    def _get_records_for_query(self, query_type, table, args):
+        """Determine which records and lock types are needed for a query"""
+        return _LOCK_HANDLERS[query_type](table, args)
 
     def abort(self):
         """Abort transaction and rollback changes"""
@@ -238,10 +259,10 @@ class Transaction:
         self._aborted = True
         
         # Rollback modifications on all affected tables
-        for table in self.tables_modified:
+        modifications_by_table, self.modifications_by_table = self.modifications_by_table, {}
+        for table, modifications in modifications_by_table.items():
             try:
-                # Pass transaction_id so it knows which modifications to rollback
-                table.rollback_modifications(self.transaction_id)
+                table.rollback_modifications(modifications)
             except Exception as e:
                 print(f"Error rolling back modifications for {table.name}: {e}")
         
@@ -261,9 +282,7 @@ class Transaction:
             self.lock_manager.release_locks(self.transaction_id)
 
         # Clear recorded modifications since we're committing
-        for table in self.tables_modified:
-            with table._transaction_modifications_lock:
-                table._transaction_modifications = [m for m in table._transaction_modifications if m['transaction_id'] != self.transaction_id]
+        self.modifications_by_table = {}
         
         return True
 
@@ -1,19 +1,67 @@
 from lstore.table import Table, Record
 from lstore.index import Index
-from lstore.config import MAX_RETRIES
-from threading import Thread
+from lstore.config import MAX_RETRIES, TRANSACTION_WORKER_THREADS
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+import os
+
+
+# One pool of threads shared by every worker, instead of a new thread per run() call.
+# The pool reuses an idle thread when there is one and starts a new thread otherwise, so
+# it grows to the number of workers running at once (capped by TRANSACTION_WORKER_THREADS).
+# Pool threads are non-daemon, unlike the daemon thread each worker used to start: at
+# interpreter exit, a worker still running finishes its transactions instead of being killed
+# mid-transaction with its locks held and its writes half applied.
+_worker_pool = None
+_worker_pool_lock = Lock()
+
+
+def _get_worker_pool():
+    global _worker_pool
+    if _worker_pool is None:
+        with _worker_pool_lock:
+            if _worker_pool is None:
+                _worker_pool = ThreadPoolExecutor(max_workers=TRANSACTION_WORKER_THREADS, thread_name_prefix="txn")
+    return _worker_pool
+
+
+def _reset_worker_pool():
+    # a forked child does not inherit the parent's pool threads, so start over with a fresh pool
+    global _worker_pool, _worker_pool_lock
+    _worker_pool = None
+    _worker_pool_lock = Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_worker_pool)
+
+
+def _run_transaction(transaction):
+    """
+    Runs one transaction, returning 1 if it committed and 0 if it aborted or crashed
+    """
+    try:
+        return 1 if transaction.run() else 0
+    except Exception:
+        return 0
 
 
 class TransactionWorker:
 
     """
     Creates a transaction worker object.
+    Each run() executes on a thread of the module's shared pool. Workers started together
+    run concurrently, each on its own thread, up to TRANSACTION_WORKER_THREADS.
+    The pool threads are not daemon threads, so exiting waits for running workers to finish.
     """
     def __init__(self, transactions=None, db=None):
-        self.stats = []
-        self.transactions = list(transactions) if transactions else []
+        self.stats = bytearray()  # one byte per transaction: 1 committed, 0 aborted
+        # queue of transactions still to run; deque append/popleft are atomic, so producers
+        # can keep adding while the worker drains it
+        self.transactions = deque(transactions) if transactions else deque()
         self.result = 0
-        self._thread = None
+        self._future = None
         self.db = db
 
     def add_transaction(self, t):
@@ -22,30 +70,36 @@ class TransactionWorker:
         """
         self.transactions.append(t)
 
+    def add_transactions(self, transactions):
+        """
+        Appends every transaction in transactions, keeping their order
+        """
+        self.transactions.extend(transactions)
+
     def run(self):
         """
         Runs all transaction as a thread
         """
-        if self._thread is None or not self._thread.is_alive():
-            self._thread = Thread(target=self.__run, daemon=True)
-            self._thread.start()
-        # here you need to create a thread and call __run
+        if self._future is None or self._future.done():
+            self._future = _get_worker_pool().submit(self.__run)
 
     def join(self):
         """
         Waits for the worker to finish
         """
-        if self._thread is not None:
-            self._thread.join()
+        if self._future is not None:
+            self._future.result()
 
     def __run(self):
-        for transaction in self.transactions:
-            # Transaction.run() already handles retries by default with auto_retry=True
+        # bind the per-iteration methods once instead of looking them up for every transaction
+        next_transaction = self.transactions.popleft
+        record = self.stats.append
+        while True:
             try:
-                committed = transaction.run()
-            except Exception:
-                committed = False
-
-            self.stats.append(committed)
-
-        self.result = sum(1 for ok in self.stats if ok)
+                transaction = next_transaction()
+            except IndexError:
+                break  # queue drained
+            # Transaction.run() already handles retries by default with auto_retry=True
+            record(_run_transaction(transaction))
+        # stores the number of transactions that committed, over every run of this worker
+        self.result = self.stats.count(1)